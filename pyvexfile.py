@@ -35,12 +35,12 @@ version 1.1 changes
 
 """
 
+import io
 import os
+import re
 import sys
-import copy
+import mmap
 from enum import Enum
-from collections import OrderedDict
-# default dicts are realiable ordered only in 3.7 and later, not in 3.6
 
 
 
@@ -63,6 +63,54 @@ class EntryType(Enum):
 
 
 
+# Indentation written before non-comment entries. Precomputed so __str__ does
+# not rebuild the same string once per entry during a full-file serialization
+_DEFAULT_INDENT = ' ' * 5
+_INDENT_CACHE = {}
+
+
+def _indent(heading_spaces):
+    if heading_spaces is None:
+        return _DEFAULT_INDENT
+
+    return _INDENT_CACHE.setdefault(heading_spaces, ' '*heading_spaces)
+
+
+# One render function per (EntryType, value-is-list) combination, picked once
+# when the Entry value is set so __str__ does not re-dispatch on every call
+
+def _render_comment(entry, heading_spaces):
+    return f'*{entry.value}\n'
+
+
+def _render_variable_scalar(entry, heading_spaces):
+    return _indent(heading_spaces) + f"ref ${entry.key} = {entry._value};\n"
+
+
+def _render_variable_list(entry, heading_spaces):
+    return _indent(heading_spaces) + f"ref ${entry.key} = {':'.join(entry._value)};\n"
+
+
+def _render_parameter_scalar(entry, heading_spaces):
+    return _indent(heading_spaces) + f"{entry.key} = {entry._value};\n"
+
+
+def _render_parameter_list(entry, heading_spaces):
+    return _indent(heading_spaces) + f"{entry.key} = {':'.join(entry._value)};\n"
+
+
+_RENDERERS = {(EntryType.comment, False): _render_comment,
+              (EntryType.comment, True): _render_comment,
+              (EntryType.variable, False): _render_variable_scalar,
+              (EntryType.variable, True): _render_variable_list,
+              (EntryType.parameter, False): _render_parameter_scalar,
+              (EntryType.parameter, True): _render_parameter_list}
+
+
+def _pick_render(type_entry, value_is_list):
+    return _RENDERERS[(type_entry, value_is_list)]
+
+
 class Entry:
     """Defines an entry in a vex file, that can be either a comment (everything after a *),
     a parameter (key = value;), or a variable definition (ref $key = value;).
@@ -71,79 +119,54 @@ class Entry:
     In the case of a comment line, the key is ignored and all the information is stored in value
     """
 
+    __slots__ = ('type', 'key', '_value', '_render')
+
     def __init__(self, type_entry, key, value):
-        # self._type = None
+        # The checks disappear under 'python -O', where the parser is assumed
+        # to only ever produce consistent entries
+        if __debug__:
+            if not isinstance(type_entry, EntryType):
+                raise ValueError(f'{type_entry} is not an accepted EntryType')
+
+            if (type_entry is EntryType.comment) and (key is not None):
+                raise ValueError('key must be None for comment entries')
+
         self.type = type_entry
         self.key = key
         self.value = value
-        self.__name__ = 'Entry'
-
-
-    @property
-    def type(self):
-        """Type of the entry. It can only be 'parameter', 'variable', or 'comment'
-        """
-        return self._type
-
-    @type.setter
-    def type(self, type_entry):
-        if not isinstance(type_entry, EntryType):
-            raise ValueError(f'{type_entry} is not an accepted EntryType')
-
-        self._type = type_entry
 
 
     @property
-    def key(self):
-        return self._key
+    def value(self):
+        return self._value
 
 
-    @key.setter
-    def key(self, a_key):
-        if (self.type is EntryType.comment) and (a_key is not None):
-            raise ValueError('key must be None for comment entries')
-
-        self._key = a_key
+    @value.setter
+    def value(self, a_value):
+        self._value = a_value
+        # Pick the render function matching the (type, value) combination
+        # once. List values are re-joined on every render on purpose: they
+        # may be edited in place, so caching the joined form would serialize
+        # stale output
+        self._render = _pick_render(self.type, isinstance(a_value, list))
 
 
     def entry_from_text(text):
         """Interprets a string line (such as a line in the vex file) and saves it as an Entry
-        object
+        object. Returns None for blank lines.
         """
-        if text.strip()[0] == '*':
-            # It is a comment line. Nothing additionally to do
-            return Entry(EntryType.comment, key=None, value=text.strip()[1:])
-
-        assert text.count('=') >= 1
-        key, *value = [i for i in text.split('=')]
-        key = key.strip()
-        if type(value) is list:
-            # In the case of >1 everything after the first = will be placed as the value (str)
-            value = '='.join(value)
-
-        value = value.strip()
-        if value[-1] == ';':
-            value = value[:-1]
-
-        if 'ref ' in key:
-            # This is a variable definition
-            assert key.count('$') == 1
-            key = key.split('$')[1].strip()
-            text_entry = EntryType.variable
-        else:
-            # Should not be spaces in the key
-            # assert key.count(' ') == 0
-            text_entry = EntryType.parameter
+        text = text.strip()
+        if not text:
+            return None
 
-        # Removing the trailing ; that denotes the end of the line
-        # DO NOT DO THAT!! in some places as in the $FREQ, cahn_def, there are comment after it that
-        # should remain and they would produce a bad bahavior later
-        # value = value.replace(';', '')
-        # Value can be a list of values (separated by a :)
-        if ':' in value:
-            value = value.split(':')
+        if text[0] == '*':
+            # It is a comment line. Nothing additionally to do
+            return Entry(EntryType.comment, key=None, value=text[1:])
 
-        return Entry(text_entry, key, value)
+        # Everything after the first = is the value (str), without intermediate lists
+        key, sep, value = text.partition('=')
+        assert sep
+        return _entry_from_key_value(key, value)
 
 
     def __getitem__(self, key):
@@ -167,37 +190,106 @@ class Entry:
         return self.__str__(heading_spaces)
 
 
-    def __str__(self, heading_spaces=None):
-        if heading_spaces is None:
-            s = ' '*5
-        else:
-            s = ' '*heading_spaces
+    def _write(self, buf, heading_spaces=None):
+        buf.write(self._render(self, heading_spaces))
 
-        if self.type is EntryType.comment:
-            return f'*{self.value}\n'
-        elif self.type is EntryType.variable:
-            if type(self.value) is list:
-                return s + f"ref ${self.key} = {':'.join(self.value)};\n"
-            else:
-                return s + f"ref ${self.key} = {self.value};\n"
-        elif self.type is EntryType.parameter:
-            if type(self.value) is list:
-                return s + f"{self.key} = {':'.join(self.value)};\n"
-            else:
-                return s + f"{self.key} = {self.value};\n"
-        else:
-            # Just as control. To make sure noone updated wrongly this code.
-            raise ValueError('The EntryType is inconsistent with the __str__ representations of Entry')
+
+    def __str__(self, heading_spaces=None):
+        return self._render(self, heading_spaces)
 
 
     def __repr__(self):
-        return f'<{self.__module__}.{self.__name__} at {hex(id(self))}>'
+        return f'<{self.__module__}.{type(self).__name__} at {hex(id(self))}>'
+
+
+# Tokenizer for a whole vex file. Each alternative tags one kind of logical
+# record, so from_file can run a single finditer sweep inside the compiled
+# regex engine instead of classifying lines in interpreted Python. The value
+# of an entry may span several physical lines ([^;]* crosses newlines) and
+# extends to the end of the physical line holding its first ';', matching the
+# old line-accumulator behaviour. Comment lines interleaved in a multi-line
+# value are consumed atomically by the value group, so a ';' inside them does
+# not terminate the value early (_parse_bytes extracts them afterwards).
+# Compiled as a bytes pattern so it can scan an mmap-ed file directly,
+# without decoding text that is never kept.
+_VEX_RE = re.compile(rb'''^[\ \t]*\*(?P<comment>[^\n]*)
+                         |^[\ \t]*\$(?P<section>[^;\n]+);
+                         |^[\ \t]*def[\ \t]+(?P<def_>[^;\n]+);
+                         |^[\ \t]*(?P<enddef>enddef[\ \t]*;)
+                         |^[\ \t]*scan[\ \t]+(?P<scan>[^;\n]+);
+                         |^[\ \t]*(?P<endscan>endscan[\ \t]*;)
+                         |^[\ \t]*(?P<key>[^=\n]+?)=(?P<value>(?:\n[\ \t]*\*[^\n]*|[^;])*;[^\n]*)
+                       ''', re.MULTILINE | re.VERBOSE)
+
+# Helpers for the per-section pre-sizing in _parse_bytes, tolerant of
+# indented section headers and def/scan lines (a plain substring count
+# would miss them and pre-size to zero)
+_NEXT_SECTION_RE = re.compile(rb'\n[\ \t]*\$')
+_DEF_OR_SCAN_RE = re.compile(rb'^[\ \t]*(?:def|scan)[\ \t]', re.MULTILINE)
+
+
+def _entry_from_key_value(key, value):
+    """Builds an Entry from the two sides of a 'key = value;' record, with
+    the key and value still unstripped.
+    """
+    key = key.strip()
+    if '\n' in value:
+        # Entry spread over multiple lines: normalize it into a single line
+        value = ' '.join(part.strip() for part in value.split('\n'))
+
+    value = value.strip().rstrip(';').rstrip()
+    if key.startswith('ref '):
+        # This is a variable definition
+        assert key.count('$') == 1
+        key = key[key.index('$')+1:].strip()
+        text_entry = EntryType.variable
+    else:
+        # Should not be spaces in the key
+        # assert key.count(' ') == 0
+        text_entry = EntryType.parameter
+
+    # Removing the trailing ; that denotes the end of the line
+    # DO NOT DO THAT!! in some places as in the $FREQ, cahn_def, there are comment after it that
+    # should remain and they would produce a bad bahavior later
+    # value = value.replace(';', '')
+    # Value can be a list of values (separated by a :)
+    if ':' in value:
+        value = value.split(':')
+
+    # Keys repeat thousands of times in a vex file (chan_def, station, ...);
+    # interning keeps a single copy and speeds up the dict lookups on them
+    return Entry(text_entry, sys.intern(key), value)
+
+
+def _new_dict(estimate=0):
+    """Returns an empty dict whose hash table is pre-sized for roughly
+    'estimate' insertions, so filling it does not trigger intermediate
+    rehashes. CPython has no public way to reserve dict capacity, but a dict
+    keeps its table when its keys are deleted one by one (clear() would
+    release it), so over-filling and emptying leaves the larger table behind.
+    """
+    if estimate <= 16:
+        return {}
+
+    new_dict = dict.fromkeys(range(estimate))
+    for a_key in range(estimate):
+        del new_dict[a_key]
+
+    return new_dict
+
+
+def _flat_entries(entries):
+    """Yields every Entry stored in a dict of entries, unpacking the lists
+    that hold the entries of repeated keys.
+    """
+    for an_entry in entries.values():
+        yield from (an_entry if isinstance(an_entry, list) else (an_entry,))
 
 
-class Definition(OrderedDict):
+class Definition(dict):
     """Represents a definition from a vex file (everything between a 'def name;' line and 'enddef;'
-    A Definition consists of a name (the name written right after 'def', and an OrderedDict containing
-    all the Entries within that definition. The keys from the OrderedDict are the same as the key in
+    A Definition consists of a name (the name written right after 'def', and a dict containing
+    all the Entries within that definition. The keys from the dict are the same as the key in
     each Entry (see that help, basically following the ' key = params..;'  format). For each key one
     of more entries are possible (in case the same key is used multiple types within that definition,
     e.g. as typically happens in 'ref $IF = ...' entries.
@@ -206,11 +298,20 @@ class Definition(OrderedDict):
     this is the #-line within this definition.
 
     An empty Definition (without any entry) can be created, although a name must always be provided.
+
+    Internally every key maps to a (possibly singleton) list of Entries. __getitem__ and pop
+    unwrap the singleton ones, so unique keys read as plain Entries and repeated keys as lists,
+    while keys()/values()/items() expose the raw list-per-key storage.
     """
+
+    # Keywords delimiting the definition block; Scan overrides them
+    _OPEN = 'def'
+    _CLOSE = 'enddef'
+
     def __init__(self, name, list_of_entries=None):
         self.name = name
         if list_of_entries is None:
-            self._entries = OrderedDict()
+            self._entries = {}
         else:
             self.entries = list_of_entries
 
@@ -224,7 +325,7 @@ class Definition(OrderedDict):
 
     @entries.setter
     def entries(self, new_entries):
-        self._entries = OrderedDict()
+        self._entries = {}
         for an_entry in new_entries:
             self.add_entry(an_entry)
 
@@ -232,33 +333,33 @@ class Definition(OrderedDict):
     def add_entry(self, new_entry):
         """Add a new entry to the list of entries already available in this Definition. It will be
         appended to the end (after all the previous entries). new_entry must be an Entry object.
+        All entries are stored internally in (possibly singleton) lists per key; __getitem__
+        unwraps the singleton ones, so repeated keys still read as lists and unique keys as
+        plain Entries.
         """
         assert isinstance(new_entry, Entry)
         if new_entry.type is EntryType.comment:
             self._number_comments += 1
-            self._entries[f'comment-{self._number_comments}'] = new_entry
+            self._entries[f'comment-{self._number_comments}'] = [new_entry]
         else:
-            # If it is an existing key, then add the Entry as a new element in a list
-            #for such key. NOTE that this will force that all entries for the same key
-            # will be consecutive in the final Definition, even if in the input they
-            # are not
-            if new_entry.key in self._entries:
-                if type(self._entries[new_entry.key]) is list:
-                    # There were already more than one entry
-                    self._entries[new_entry.key].append(new_entry)
-                else:
-                    # There was only one entry, meaning that the value was the Entry object
-                    self._entries[new_entry.key] = [self._entries[new_entry.key], new_entry]
-            else:
-                self._entries[new_entry.key] = new_entry
+            # All the entries for the same key end up in the same list, in a single
+            # dict lookup. NOTE that this will force that all entries for the same
+            # key will be consecutive in the final Definition, even if in the input
+            # they are not
+            self._entries.setdefault(new_entry.key, []).append(new_entry)
 
 
     def __getitem__(self, key):
-        return self._entries[key]
+        an_entry = self._entries[key]
+        if isinstance(an_entry, list) and (len(an_entry) == 1):
+            return an_entry[0]
+
+        return an_entry
 
 
     def __setitem__(self, key, value):
-        self._entries[key] = value
+        # Keep the per-key singleton-list invariant that add_entry relies on
+        self._entries[key] = value if isinstance(value, list) else [value]
 
 
     def __len__(self):
@@ -286,7 +387,11 @@ class Definition(OrderedDict):
 
 
     def pop(self, *args):
-        return self._entries.pop(*args)
+        an_entry = self._entries.pop(*args)
+        if isinstance(an_entry, list) and (len(an_entry) == 1):
+            return an_entry[0]
+
+        return an_entry
 
 
     def __contains__(self, item):
@@ -301,43 +406,26 @@ class Definition(OrderedDict):
         return self.__str__()
 
 
-    def __str__(self):
-        # Preferred way. In CPython += strings is much faster but only there.
-        s = [f'def {self.name};\n']
-        for an_entry in self.entries.values():
-            if type(an_entry) is list:
-                for an_entry2 in an_entry:
-                    s.append(an_entry2.to_string())
-            else:
-                s.append(an_entry.to_string())
-
-        s.append('enddef;\n')
-        return ''.join(s)
-
-
-
-class Scan(Definition):
+    def _write(self, buf):
+        buf.write(f'{self._OPEN} {self.name};\n')
+        for an_entry in _flat_entries(self.entries):
+            an_entry._write(buf)
 
-    def __init__(self, name, list_of_entries=None):
-        super().__init__(name, list_of_entries)
+        buf.write(f'{self._CLOSE};\n')
 
 
-    def to_string(self):
-        return self.__str__()
+    def __str__(self):
+        buf = io.StringIO()
+        self._write(buf)
+        return buf.getvalue()
 
 
-    def __str__(self):
-        # Preferred way. In CPython += strings is much faster but only there.
-        s = [f'scan {self.name};\n']
-        for an_entry in self.entries.values():
-            if type(an_entry) is list:
-                for an_entry2 in an_entry:
-                    s.append(an_entry2.to_string())
-            else:
-                s.append(an_entry.to_string())
 
-        s.append('endscan;\n')
-        return ''.join(s)
+class Scan(Definition):
+    """A Definition delimited by 'scan'/'endscan' lines instead of 'def'/'enddef'.
+    """
+    _OPEN = 'scan'
+    _CLOSE = 'endscan'
 
 
 
@@ -346,15 +434,17 @@ class Section:
     can contain entries and/or definitions. It cover everything below such line until
     another section is declared.
     """
+
+    __slots__ = ('name', '_definitions', '_number_comments')
+
     def __init__(self, name, definitions=None):
         self.name = name
         if definitions is not None:
             self.definitions = definitions
         else:
-            self._definitions = OrderedDict()
+            self._definitions = {}
 
         self._number_comments = 0
-        self.__name__ = 'Section'
 
 
     @property
@@ -366,7 +456,7 @@ class Section:
     def definitions(self, new_definitions):
         """A definition can be either a Definition or an Entry (typically because it is a comment line)
         """
-        self._definitions = OrderedDict()
+        self._definitions = {}
         for new_definition in new_definitions:
             self.add_definition(new_definition)
 
@@ -435,17 +525,22 @@ class Section:
         return self.__str__()
 
 
-    def __str__(self):
-        s = [f'${self.name};\n']
+    def _write(self, buf):
+        buf.write(f'${self.name};\n')
         for a_definition in self.definitions.values():
-            s.append(a_definition.to_string())
+            a_definition._write(buf)
+
+        # buf.write('*\n')
 
-        # s.append('*\n')
-        return ''.join(s)
+
+    def __str__(self):
+        buf = io.StringIO()
+        self._write(buf)
+        return buf.getvalue()
 
 
     def __repr__(self):
-        return f'<{self.__module__}.{self.__name__} {self._definitions.__repr__()} at {hex(id(self))})>'
+        return f'<{self.__module__}.{type(self).__name__} {self._definitions.__repr__()} at {hex(id(self))})>'
 
 
 
@@ -467,7 +562,7 @@ class Vex:
     """
     def __init__(self, name, vexfile=None):
         self.name = name
-        self._sections = OrderedDict()
+        self._sections = {}
         self._number_comments = 0
 
         if vexfile is not None:
@@ -483,7 +578,7 @@ class Vex:
     def sections(self, new_sections):
         """A section can be either a Definition or an Entry (typically because it is a comment line)
         """
-        self._sections = OrderedDict()
+        self._sections = {}
         for new_section in new_section:
             self.add_section(new_section)
 
@@ -553,26 +648,29 @@ class Vex:
         return self.__str__()
 
 
-    def __str__(self):
-        s = []
+    def _write(self, buf):
         for a_section in self.sections.values():
             if isinstance(a_section, Entry):
-                s.append(a_section.to_string(0))
+                a_section._write(buf, 0)
             else:
-                s.append(a_section.to_string())
+                a_section._write(buf)
 
-        return ''.join(s)
+
+    def __str__(self):
+        buf = io.StringIO()
+        self._write(buf)
+        return buf.getvalue()
 
 
     def to_file(self, filename, overwrite=True):
         """Save the current Vex object to a text file called filename.
         If overwrite is False and the file already exists, raises an Exception.
         """
-        if (not overwrite) and (os.path.exists(newfile)):
-            raise FileExistsError(f'{newfile} exists and will not be overwrite')
+        if (not overwrite) and (os.path.exists(filename)):
+            raise FileExistsError(f'{filename} exists and will not be overwrite')
 
-        with open(filename, 'w') as newfile:
-            newfile.write(self.to_string())
+        with open(filename, 'w', buffering=1 << 20) as newfile:
+            self._write(newfile)
 
 
     def from_file(self, filename):
@@ -580,77 +678,107 @@ class Vex:
         had previous data, everything will be flushed and only the data from vexfile
         will be kept.
         """
-        with open(filename, 'r') as vexfile:
-            vexlines = vexfile.readlines()
-            # In case of entries spread over multiple lines, this will be used to keep data:
-            prev_line = None
-            current_section = None
-            current_definition = None
-            for vexline in vexlines:
-                currentline = vexline
-                # print(currentline)
-                if currentline.strip()[0] == '*':
-                    if current_definition is not None:
-                        current_definition.add_entry(Entry.entry_from_text(currentline))
-                    elif current_section is not None:
-                        current_section.add_definition(Entry.entry_from_text(currentline))
-                    else:
-                        self.add_section(Entry.entry_from_text(currentline))
+        with open(filename, 'rb') as vexfile:
+            try:
+                text = mmap.mmap(vexfile.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # mmap rejects empty files (and some filesystems); fall back
+                # to reading the whole file into memory
+                self._parse_bytes(vexfile.read())
+                return
+
+        with text:
+            self._parse_bytes(text)
+
+
+    def _parse_bytes(self, text):
+        """Parses the contents of a vexfile, given as a bytes-like object
+        (an mmap of the file or the raw bytes), into the current object.
+        """
+        current_section = None
+        current_definition = None
+        # One sweep of the compiled tokenizer over the raw bytes; blank lines
+        # and the continuation lines of multi-line entries never reach Python,
+        # and only the tokens that are kept get decoded
+        for match in _VEX_RE.finditer(text):
+            kind = match.lastgroup
+            if (kind == 'value') or (kind == 'comment'):
+                if kind == 'value':
+                    value = match['value']
+                    if b'\n' in value:
+                        # Comment lines interleaved inside a multi-line value are
+                        # kept as their own comment-N entries (added before the
+                        # entry completes, as the line-by-line parser did) and
+                        # removed from the value itself
+                        kept_parts = []
+                        for part in value.split(b'\n'):
+                            part_stripped = part.strip()
+                            if part_stripped.startswith(b'*'):
+                                a_comment = Entry(EntryType.comment, key=None,
+                                                  value=part_stripped[1:].decode('utf-8'))
+                                if current_definition is not None:
+                                    current_definition.add_entry(a_comment)
+                                elif current_section is not None:
+                                    current_section.add_definition(a_comment)
+                                else:
+                                    self.add_section(a_comment)
+                            else:
+                                kept_parts.append(part)
+
+                        value = b'\n'.join(kept_parts)
+
+                    an_entry = _entry_from_key_value(match['key'].decode('utf-8'),
+                                                     value.decode('utf-8'))
+                else:
+                    an_entry = Entry(EntryType.comment, key=None,
+                                     value=match['comment'].decode('utf-8').rstrip())
+
+                if current_definition is not None:
+                    current_definition.add_entry(an_entry)
+                elif current_section is not None:
+                    current_section.add_definition(an_entry)
                 else:
-                    # Checks if this is the full line, otherwise save it cumulatively
-                    if ';' not in currentline:
-                        if prev_line is None:
-                            prev_line = copy.copy(currentline)
-                        else:
-                            prev_line += copy.copy(currentline)
-                        continue
-
-                    if prev_line is not None:
-                        currentline = prev_line + currentline
-                        prev_line = None
-
-                    currentline = currentline.strip()
-                    # Evaluates the different possible key words
-                    if currentline[0] == '$':
-                        if current_section is not None:
-                            # we just finished the prev. section and we are starting a new one
-                            self.add_section(current_section)
-
-                        current_section = Section(currentline[1:currentline.index(';')])
-                    elif currentline[:4] == 'def ':
-                        if current_definition is not None:
-                            raise ValueError('A definition inside a definition is not supported')
-
-                        current_definition = Definition(currentline[4:currentline.index(';')])
-                    elif currentline[:6] == 'enddef':
-                        if current_definition is None:
-                            raise ValueError('enddef without a previous def')
-
-                        current_section.add_definition(current_definition)
-                        current_definition = None
-                    elif currentline[:5] == 'scan ':
-                        if current_definition is not None:
-                            raise ValueError('A definition inside a definition is not supported')
-
-                        current_definition = Scan(currentline[5:currentline.index(';')])
-                    elif currentline[:7] == 'endscan':
-                        if current_definition is None:
-                            raise ValueError('endscan without a previous scan')
-
-                        current_section.add_definition(current_definition)
-                        current_definition = None
-                    else:
-                        # It is going to be an entry
-                        if current_definition is not None:
-                            current_definition.add_entry(Entry.entry_from_text(currentline))
-                        elif current_section is not None:
-                            current_section.add_definition(Entry.entry_from_text(currentline))
-                        else:
-                            self.add_section(Entry.entry_from_text(currentline))
-
-            # End of the file, add the final section if exists
-            if current_section is not None:
-                self.add_section(current_section)
+                    self.add_section(an_entry)
+            elif kind == 'section':
+                if current_section is not None:
+                    # we just finished the prev. section and we are starting a new one
+                    self.add_section(current_section)
+
+                current_section = Section(sys.intern(match['section'].decode('utf-8')))
+                # Pre-size the section for the definitions/scans declared before
+                # the next section header; the counting runs inside the regex
+                # engine (no span copy) and big sections (e.g. the scans in
+                # $SCHED) then fill their dict without any intermediate rehash
+                next_section = _NEXT_SECTION_RE.search(text, match.end())
+                span_end = next_section.start() if next_section is not None else len(text)
+                current_section._definitions = _new_dict(
+                    sum(1 for _ in _DEF_OR_SCAN_RE.finditer(text, match.end(), span_end)))
+            elif kind == 'def_':
+                if current_definition is not None:
+                    raise ValueError('A definition inside a definition is not supported')
+
+                current_definition = Definition(sys.intern(match['def_'].decode('utf-8')))
+            elif kind == 'enddef':
+                if current_definition is None:
+                    raise ValueError('enddef without a previous def')
+
+                current_section.add_definition(current_definition)
+                current_definition = None
+            elif kind == 'scan':
+                if current_definition is not None:
+                    raise ValueError('A definition inside a definition is not supported')
+
+                current_definition = Scan(sys.intern(match['scan'].decode('utf-8')))
+            elif kind == 'endscan':
+                if current_definition is None:
+                    raise ValueError('endscan without a previous scan')
+
+                current_section.add_definition(current_definition)
+                current_definition = None
+
+        # End of the file, add the final section if exists
+        if current_section is not None:
+            self.add_section(current_section)
 
 
 